@@ -1,5 +1,6 @@
 import yfinance as yf
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 
 def download_spy_data():
@@ -21,16 +22,16 @@ def download_spy_data():
     # Reorder columns to match required format
     df = df[['Date', 'Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']]
     
-    # Ensure Date is in YYYY-MM-DD format
-    df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
+    # Keep Date as a plain (timezone-naive) datetime64 column: Parquet stores it typed, no string formatting
+    df['Date'] = df['Date'].dt.tz_localize(None).dt.normalize()
     
     # Round numeric columns to 6 decimal places for cleaner output
     numeric_columns = ['Open', 'High', 'Low', 'Close', 'Adj Close']
-    df[numeric_columns] = df[numeric_columns].round(6)
+    df[numeric_columns] = np.round(df[numeric_columns].to_numpy(), 6)
     
-    # Save to CSV
-    df.to_csv('data/sample_data.csv', index=False)
-    print(f"Successfully downloaded {len(df)} days of SPY data to data/sample_data.csv")
+    # Save to Parquet (columnar and typed: loads without re-parsing dates)
+    df.to_parquet('data/sample_data.parquet', index=False)
+    print(f"Successfully downloaded {len(df)} days of SPY data to data/sample_data.parquet")
     print("\nFirst few rows of the data:")
     print(df.head().to_string())
 
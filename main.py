@@ -1,20 +1,25 @@
 import pandas as pd
 import itertools
+import logging
 import os
 import time
 
 from src.data_handler import load_data
-from src.strategy import MomentumStrategy, MeanReversionStrategy, SMACrossoverStrategy # Import strategies
-from src.backtester import run_backtest
-from src.performance import calculate_performance_metrics
+from src.strategy import MomentumStrategy, MeanReversionStrategy, SMACrossoverStrategy, precompute_features # Import strategies
+from src.backtester import run_backtest, run_backtest_batch
+from src.performance import calculate_performance_metrics_batch
 from src.plotting import plot_equity_curve
 import numpy as np
+from tqdm import tqdm
+
+logger = logging.getLogger(__name__)
 
 # --- Configuration ---
-DATA_FILEPATH = 'data/sample_data.csv' # MAKE SURE THIS HAS 5+ YEARS OF DATA
+DATA_FILEPATH = 'data/sample_data.parquet' # MAKE SURE THIS HAS 5+ YEARS OF DATA (.csv also supported)
 OUTPUT_DIR = 'backtest_results' # Folder to save results
 INITIAL_CAPITAL = 100000.0
 RISK_FREE_RATE = 0.02 # Example annual risk-free rate (e.g., 2%)
+METRIC_KEYS = ['CAGR', 'Annualized Sharpe Ratio', 'Annualized Sortino Ratio', 'Max Drawdown', 'Calmar Ratio', 'Cumulative Return', 'Annualized Volatility', 'Total Trades']
 
 # --- Parameter Grid ---
 param_grid = {
@@ -33,33 +38,145 @@ param_grid = {
 
 # --- Helper Function to Generate Combinations ---
 def generate_parameter_combinations(grid):
-    # Create lists of dictionaries, one for each strategy type
+    # Build one flat list of parameter dicts, straight from itertools.product over the grid lists
     combinations = []
+    shorting = grid['allow_shorting']
 
     # Momentum
-    mom_keys = ['strategy_type', 'allow_shorting', 'momentum_window']
-    mom_grid = {k: grid[k] for k in mom_keys if k in grid}
-    mom_grid['strategy_type'] = ['momentum'] # Ensure type is correct
-    mom_values = [dict(zip(mom_grid.keys(), v)) for v in itertools.product(*mom_grid.values())]
-    combinations.extend(mom_values)
+    for allow_shorting, window in itertools.product(shorting, grid['momentum_window']):
+        combinations.append({'strategy_type': 'momentum', 'allow_shorting': allow_shorting,
+                             'momentum_window': window})
 
     # Mean Reversion
-    mr_keys = ['strategy_type', 'allow_shorting', 'mean_reversion_window', 'mean_reversion_entry_z', 'mean_reversion_exit_z']
-    mr_grid = {k: grid[k] for k in mr_keys if k in grid}
-    mr_grid['strategy_type'] = ['mean_reversion']
-    mr_values = [dict(zip(mr_grid.keys(), v)) for v in itertools.product(*mr_grid.values())]
-    combinations.extend(mr_values)
+    for allow_shorting, window, entry_z, exit_z in itertools.product(
+            shorting, grid['mean_reversion_window'], grid['mean_reversion_entry_z'], grid['mean_reversion_exit_z']):
+        # Skip invalid Mean Reversion combinations (exit threshold must be inside the entry threshold)
+        if exit_z >= entry_z:
+            continue
+        combinations.append({'strategy_type': 'mean_reversion', 'allow_shorting': allow_shorting,
+                             'mean_reversion_window': window, 'mean_reversion_entry_z': entry_z,
+                             'mean_reversion_exit_z': exit_z})
 
     # SMA Crossover
-    sma_keys = ['strategy_type', 'allow_shorting', 'sma_short_window', 'sma_long_window']
-    sma_grid = {k: grid[k] for k in sma_keys if k in grid}
-    sma_grid['strategy_type'] = ['sma_crossover']
-    sma_values = [dict(zip(sma_grid.keys(), v)) for v in itertools.product(*sma_grid.values())]
-    # Filter out invalid SMA combinations (short >= long)
-    sma_values = [p for p in sma_values if p['sma_short_window'] < p['sma_long_window']]
-    combinations.extend(sma_values)
-
-    return combinations
+    for allow_shorting, short_window, long_window in itertools.product(
+            shorting, grid['sma_short_window'], grid['sma_long_window']):
+        # Skip invalid SMA combinations (short >= long)
+        if short_window >= long_window:
+            continue
+        combinations.append({'strategy_type': 'sma_crossover', 'allow_shorting': allow_shorting,
+                             'sma_short_window': short_window, 'sma_long_window': long_window})
+
+    # Drop duplicates (e.g. repeated values in the grid lists), keeping the first occurrence
+    unique = {}
+    for p in combinations:
+        unique.setdefault(tuple(sorted(p.items())), p)
+    return list(unique.values())
+
+# --- Helper Functions to Run the Sweep ---
+def signal_key(params):
+    """
+    Returns the tuple of parameters that determine a combination's signals.
+
+    `allow_shorting` only affects the backtest, so combinations that differ only in it
+    share the same key (and the same signal vector).
+    """
+    stype = params['strategy_type']
+    if stype == 'momentum':
+        return (stype, params['momentum_window'])
+    if stype == 'mean_reversion':
+        return (stype, params['mean_reversion_window'],
+                params['mean_reversion_entry_z'], params['mean_reversion_exit_z'])
+    if stype == 'sma_crossover':
+        return (stype, params['sma_short_window'], params['sma_long_window'])
+    return (stype,)
+
+def group_by_signal_key(combinations):
+    """Groups (index, params) pairs by signal_key, preserving first-appearance order."""
+    groups = {}
+    for i, params in enumerate(combinations):
+        groups.setdefault(signal_key(params), []).append((i, params))
+    return groups
+
+def _generate_signals(data, key, features=None):
+    """
+    Initializes the strategy described by a signal_key and returns its signals.
+
+    `features` (from precompute_features on the same data) lets the rolling strategies reuse
+    shared rolling statistics instead of recomputing them.
+    """
+    stype = key[0]
+    strategy = None
+    if stype == 'momentum':
+         strategy = MomentumStrategy(data, window=key[1])
+    elif stype == 'mean_reversion':
+         strategy = MeanReversionStrategy(data, window=key[1], entry_z=key[2], exit_z=key[3], features=features)
+    elif stype == 'sma_crossover':
+         strategy = SMACrossoverStrategy(data, short_window=key[1], long_window=key[2], features=features)
+    return strategy.generate_signals() if strategy else None
+
+def _signals_for_key(data, key, features=None):
+    """
+    Generates the signal vector for one signal_key.
+
+    Returns:
+        tuple: (key, float32 signal array or None if the strategy could not be built/run)
+    """
+    try:
+        signals = _generate_signals(data, key, features)
+    except Exception as e:
+        logger.warning("Signals %s: Error during strategy initialization/signal generation: %s", key, e)
+        return key, None
+    if signals is None or signals.empty:
+        logger.warning("Signals %s: Strategy produced no signals.", key)
+        return key, None
+    # Signals are generated from `data`, so they are already aligned with the price arrays
+    return key, signals['signal'].to_numpy(dtype=np.float32)
+
+def run_sweep(data, mret, combinations, initial_capital, risk_free_rate):
+    """
+    Runs every combination as one batched backtest.
+
+    Rolling statistics for every window in the sweep are precomputed once (precompute_features),
+    unique signal vectors are generated in-process (each takes well under a millisecond, less than
+    starting a worker pool would cost), stacked into an (N x K) matrix with one column per
+    combination, and backtested/scored with
+    column-wise NumPy operations (run_backtest_batch / calculate_performance_metrics_batch).
+
+    Returns:
+        list: (index, params, metrics) tuples in the original combination order.
+    """
+    groups = group_by_signal_key(combinations)
+    # Rolling statistics are computed once per distinct window and shared by every signal_key using it
+    features = precompute_features(
+        data,
+        sma_windows=[w for key in groups if key[0] == 'sma_crossover' for w in key[1:3]],
+        mr_windows=[key[1] for key in groups if key[0] == 'mean_reversion'])
+    signal_by_key = dict(_signals_for_key(data, key, features)
+                         for key in tqdm(groups, desc='Generating signals', unit='signal'))
+
+    # One column per runnable combination (both shorting variants share a signal vector)
+    runnable = [i for i, params in enumerate(combinations) if signal_by_key[signal_key(params)] is not None]
+    batch_metrics = []
+    if runnable:
+        signal_matrix = np.column_stack([signal_by_key[signal_key(combinations[i])] for i in runnable])
+        allow_shorting = np.array([combinations[i]['allow_shorting'] for i in runnable], dtype=bool)
+        batch = run_backtest_batch(mret, signal_matrix, allow_shorting,
+                                   initial_capital=initial_capital, index=data.index)
+        if batch is not None:
+            batch_metrics = calculate_performance_metrics_batch(batch, risk_free_rate=risk_free_rate)
+    metrics_by_index = dict(zip(runnable, batch_metrics))
+
+    results = []
+    for i, params in enumerate(combinations):
+        metrics = metrics_by_index.get(i)
+        if metrics is None:
+            # Ensure metrics dict has NaN values if the combination could not be run
+            metrics = {k: np.nan for k in METRIC_KEYS}
+        else:
+            logger.debug("Combination %d %s -> Sharpe=%.2f, CAGR=%.2f%%, MaxDD=%.2f%%", i + 1, params,
+                         metrics['Annualized Sharpe Ratio'], 100 * metrics['CAGR'], 100 * metrics['Max Drawdown'])
+        results.append((i, params, metrics))
+    return results
 
 # --- Main Execution ---
 if __name__ == "__main__":
@@ -78,80 +195,38 @@ if __name__ == "__main__":
         print("\nFailed to load data. Exiting.")
         exit()
 
+    # Market returns are identical for every combination: compute them once.
+    # The sweep runs on float32 (half the bytes per array); returns are computed in float64
+    # first because relative differences of float32 prices keep only ~4 significant digits.
+    px = data['Adj Close'].to_numpy(dtype=np.float64)
+    mret64 = np.empty_like(px)
+    mret64[0] = 0.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(px[1:], px[:-1], out=mret64[1:])
+    mret64[1:] -= 1.0
+    # Missing or non-finite returns count as 0, like pct_change().fillna(0.0) (and _backtest_core)
+    mret64[~np.isfinite(mret64)] = 0.0
+    mret = mret64.astype(np.float32)
+
     # 2. Generate Parameter Combinations
     parameter_combinations = generate_parameter_combinations(param_grid)
     print(f"\nGenerated {len(parameter_combinations)} parameter combinations to test.")
 
     all_results = []
     best_sharpe = -np.inf
-    best_portfolio = None
     best_params = None
     best_metrics = None
 
-    # 3. Loop Through Combinations and Run Backtests
-    for i, params in enumerate(parameter_combinations):
-        print(f"\nRunning Combination {i+1}/{len(parameter_combinations)}: {params}")
-        strategy = None
-        signals = None
-        portfolio = None
-        metrics = {}
-
-        try:
-            # Initialize Strategy based on type
-            if params['strategy_type'] == 'momentum':
-                 strategy = MomentumStrategy(data, window=params['momentum_window'])
-            elif params['strategy_type'] == 'mean_reversion':
-                 strategy = MeanReversionStrategy(data, window=params['mean_reversion_window'],
-                                                 entry_z=params['mean_reversion_entry_z'],
-                                                 exit_z=params['mean_reversion_exit_z'])
-            elif params['strategy_type'] == 'sma_crossover':
-                 strategy = SMACrossoverStrategy(data, short_window=params['sma_short_window'],
-                                                 long_window=params['sma_long_window'])
-
-            # Generate Signals
-            if strategy:
-                signals = strategy.generate_signals()
-
-            # Run Backtest
-            if signals is not None and not signals.empty:
-                 portfolio = run_backtest(data, signals,
-                                          initial_capital=INITIAL_CAPITAL,
-                                          allow_shorting=params['allow_shorting'])
-
-            # Calculate Metrics
-            if portfolio is not None and not portfolio.empty:
-                metrics = calculate_performance_metrics(portfolio, risk_free_rate=RISK_FREE_RATE)
-                print(f"  -> Result: Sharpe={metrics.get('Annualized Sharpe Ratio', np.nan):.2f}, CAGR={metrics.get('CAGR', np.nan):.2%}, MaxDD={metrics.get('Max Drawdown', np.nan):.2%}")
-
-                # Track best result (e.g., based on Sharpe Ratio)
-                current_sharpe = metrics.get('Annualized Sharpe Ratio', -np.inf)
-                if pd.notna(current_sharpe) and current_sharpe > best_sharpe:
-                    best_sharpe = current_sharpe
-                    best_portfolio = portfolio.copy() # Store copy of best portfolio
-                    best_params = params.copy()
-                    best_metrics = metrics.copy()
-
-            else:
-                print("  -> Result: Backtest failed or produced empty portfolio.")
-                # Ensure metrics dict has NaN values if backtest failed
-                if not metrics:
-                    keys = ['CAGR', 'Annualized Sharpe Ratio', 'Annualized Sortino Ratio', 'Max Drawdown', 'Calmar Ratio', 'Cumulative Return', 'Annualized Volatility', 'Total Trades']
-                    for k in keys: metrics[k] = np.nan
-
-
-        except ValueError as e:
-            print(f"  -> Error during initialization/backtest: {e}")
-            # Ensure metrics dict has NaN values if error occurred
-            if not metrics:
-                keys = ['CAGR', 'Annualized Sharpe Ratio', 'Annualized Sortino Ratio', 'Max Drawdown', 'Calmar Ratio', 'Cumulative Return', 'Annualized Volatility', 'Total Trades']
-                for k in keys: metrics[k] = np.nan
-        except Exception as e:
-            print(f"  -> An unexpected error occurred: {e}")
-            # Ensure metrics dict has NaN values
-            if not metrics:
-                keys = ['CAGR', 'Annualized Sharpe Ratio', 'Annualized Sortino Ratio', 'Max Drawdown', 'Calmar Ratio', 'Cumulative Return', 'Annualized Volatility', 'Total Trades']
-                for k in keys: metrics[k] = np.nan
+    # 3. Run all Combinations as one batched backtest
+    results = run_sweep(data, mret, parameter_combinations, INITIAL_CAPITAL, RISK_FREE_RATE)
 
+    for _, params, metrics in results:
+        # Track best result (e.g., based on Sharpe Ratio); only params/metrics are kept
+        current_sharpe = metrics.get('Annualized Sharpe Ratio', -np.inf)
+        if pd.notna(current_sharpe) and current_sharpe > best_sharpe:
+            best_sharpe = current_sharpe
+            best_params = params.copy()
+            best_metrics = metrics.copy()
 
         # Store result (parameters + metrics)
         run_result = params.copy()
@@ -189,7 +264,7 @@ if __name__ == "__main__":
         print(f"Error saving results to CSV: {e}")
 
     # 5. Plot the Best Result
-    if best_portfolio is not None and best_params is not None:
+    if best_params is not None:
         print(f"\n--- Best Performing Combination (Sharpe = {best_sharpe:.3f}) ---")
         print(best_params)
         print("Metrics:")
@@ -205,6 +280,12 @@ if __name__ == "__main__":
         plot_title = f"Best Strategy: {best_params.get('strategy_type','N/A').replace('_',' ').title()} " \
                      f"(Sharpe: {best_sharpe:.2f})"
         plot_filename = os.path.join(OUTPUT_DIR, f"best_strategy_plot_{best_params.get('strategy_type','default')}.png")
+        # Regenerate the full portfolio of the winning combination once, for plotting
+        best_signals = _generate_signals(data, signal_key(best_params))
+        best_portfolio = run_backtest(data, best_signals,
+                                      initial_capital=INITIAL_CAPITAL,
+                                      allow_shorting=best_params['allow_shorting'],
+                                      assume_aligned=True)
         plot_equity_curve(best_portfolio, title=plot_title, filename=plot_filename)
     else:
         print("\nNo successful backtest runs found to determine the best performance.")
@@ -0,0 +1,711 @@
+import numpy as np
+from numba import njit, prange, int64, float64
+from numba.experimental import jitclass
+
+
+@njit(cache=True)
+def _backtest_core(px, sig, allow_short):
+    """
+    Fused single-pass backtest loop over raw price and signal arrays.
+
+    A market return that is missing or non-finite (NaN price, zero previous price) counts as 0,
+    like pct_change().fillna(0.0).
+
+    Args:
+        px (np.ndarray): float64 'Adj Close' prices.
+        sig (np.ndarray): float64 signals (1=buy, -1=sell/short, 0=hold/flat), aligned with px.
+        allow_short (bool): Whether short positions are allowed.
+
+    Returns:
+        tuple: (position, market_return, strategy_return, cumulative_market, cumulative_strategy)
+               as float64 arrays of the same length as px.
+    """
+    n = px.shape[0]
+    position = np.empty(n)
+    market_return = np.empty(n)
+    strategy_return = np.empty(n)
+    cumulative_market = np.empty(n)
+    cumulative_strategy = np.empty(n)
+    if n == 0:
+        return position, market_return, strategy_return, cumulative_market, cumulative_strategy
+
+    # First day: no previous signal (flat) and no previous price (zero return)
+    position[0] = 0.0
+    market_return[0] = 0.0
+    strategy_return[0] = 0.0
+    cumulative_market[0] = 1.0
+    cumulative_strategy[0] = 1.0
+    cum_m = 1.0
+    cum_s = 1.0
+    for i in range(1, n):
+        # Position held during day i is decided by the signal from day i-1
+        s = sig[i - 1]
+        pos = 1.0 if s > 0 else (-1.0 if s < 0 and allow_short else 0.0)
+        prev = px[i - 1]
+        mret = px[i] / prev - 1.0 if prev != 0.0 else 0.0
+        if not np.isfinite(mret):
+            mret = 0.0
+        sret = pos * mret
+        cum_m *= (1.0 + mret)
+        cum_s *= (1.0 + sret)
+        position[i] = pos
+        market_return[i] = mret
+        strategy_return[i] = sret
+        cumulative_market[i] = cum_m
+        cumulative_strategy[i] = cum_s
+    return position, market_return, strategy_return, cumulative_market, cumulative_strategy
+
+
+@njit(cache=True)
+def _return_moments(ret, rf_daily):
+    """
+    Single-pass, column-wise moments of the excess returns of a (N, K) return array.
+
+    The rows are walked once with per-column state, so a C-ordered array is read contiguously.
+    NaNs are skipped. Welford's online update matches a two-pass (ddof=1) standard deviation to
+    rounding error and gives exactly 0 for a column of identical returns.
+
+    Args:
+        ret (np.ndarray): (N, K) daily strategy returns (float32 or float64).
+        rf_daily (float): Daily risk-free rate subtracted from each return.
+
+    Returns:
+        tuple: K-length arrays (n, mean_excess, std_excess, n_down, std_down), where the *_down
+               values are over the negative excess returns and std_* are NaN for fewer than
+               two points.
+    """
+    k = ret.shape[1]
+    n = np.zeros(k, dtype=np.int64)
+    mean = np.zeros(k)
+    m2 = np.zeros(k)
+    n_down = np.zeros(k, dtype=np.int64)
+    mean_down = np.zeros(k)
+    m2_down = np.zeros(k)
+    for i in range(ret.shape[0]):
+        for j in range(k):
+            r = ret[i, j]
+            if np.isnan(r):
+                continue
+            x = r - rf_daily
+            n[j] += 1
+            delta = x - mean[j]
+            mean[j] += delta / n[j]
+            m2[j] += delta * (x - mean[j])
+            if x < 0:
+                n_down[j] += 1
+                delta_down = x - mean_down[j]
+                mean_down[j] += delta_down / n_down[j]
+                m2_down[j] += delta_down * (x - mean_down[j])
+    std = np.full(k, np.nan)
+    std_down = np.full(k, np.nan)
+    for j in range(k):
+        if n[j] > 1:
+            std[j] = np.sqrt(m2[j] / (n[j] - 1))
+        if n_down[j] > 1:
+            std_down[j] = np.sqrt(m2_down[j] / (n_down[j] - 1))
+    return n, mean, std, n_down, std_down
+
+
+@njit(cache=True)
+def _drawdown_stats(eq):
+    """
+    Single-pass, column-wise running peak and deepest drawdown of a (N, K) equity array.
+
+    NaNs are skipped; rows are walked once with per-column state like _return_moments.
+
+    Args:
+        eq (np.ndarray): (N, K) float64 equity curves.
+
+    Returns:
+        tuple: K-length arrays (n_eq, max_drawdown, non_positive), where max_drawdown is
+               relative to the running peak and non_positive flags columns with a value <= 0.
+    """
+    k = eq.shape[1]
+    n_eq = np.zeros(k, dtype=np.int64)
+    running_max = np.zeros(k)
+    max_drawdown = np.zeros(k)
+    non_positive = np.zeros(k, dtype=np.bool_)
+    for i in range(eq.shape[0]):
+        for j in range(k):
+            v = eq[i, j]
+            if np.isnan(v):
+                continue
+            if v <= 0:
+                non_positive[j] = True
+            if n_eq[j] == 0 or v > running_max[j]:
+                running_max[j] = v
+            n_eq[j] += 1
+            drawdown = (v - running_max[j]) / running_max[j]
+            if drawdown < max_drawdown[j]:
+                max_drawdown[j] = drawdown
+    return n_eq, max_drawdown, non_positive
+
+
+@njit(cache=True)
+def _momentum_signals(prices, window, out):
+    """
+    Momentum signal loop: sign of the price change over `window` days, known at day i-1.
+
+    Equivalent to sign(pct_change(window).shift(1)) for positive prices, without the division.
+    A NaN at either end of the change fails both comparisons and leaves the signal at 0
+    (no fastmath here: it lets Numba assume no NaNs and turns that case into -1).
+
+    Args:
+        prices (np.ndarray): float32 (or float64) 'Adj Close' prices; the change is taken in their dtype.
+        window (int): Momentum lookback window.
+        out (np.ndarray): int8 array of len(prices), zero-initialized; filled in place
+                          with 1 (positive momentum), -1 (negative) or 0.
+    """
+    for i in range(window + 1, prices.shape[0]):
+        d = prices[i - 1] - prices[i - 1 - window]
+        out[i] = (d > 0) - (d < 0)
+
+
+@njit(cache=True)
+def _kahan_add(total, compensation, x):
+    """Adds x to a Kahan-compensated running sum; returns the new (total, compensation)."""
+    y = x - compensation
+    t = total + y
+    return t, t - total - y
+
+
+@njit(cache=True)
+def _welford_add(mean, m2, compensation, count, x):
+    """Adds x to a compensated Welford mean/M2 (count already includes x); returns the new state."""
+    prev_mean = mean - compensation
+    t = (x - compensation) - mean
+    compensation = t + mean - (x - compensation)
+    mean += t / count
+    m2 += (x - prev_mean) * (x - mean)
+    return mean, m2, compensation
+
+
+@njit(cache=True)
+def _welford_remove(mean, m2, compensation, count, x):
+    """Removes x from a compensated Welford mean/M2 (count already excludes x, > 0); returns the new state."""
+    prev_mean = mean - compensation
+    t = (x - compensation) - mean
+    compensation = t + mean - (x - compensation)
+    mean -= t / count
+    m2 -= (x - prev_mean) * (x - mean)
+    return mean, m2, compensation
+
+
+@njit(cache=True)
+def _deviation_and_std(x, count, min_obs, run, total, m2):
+    """
+    (x - window mean, ddof=1 window std) from the rolling state, or (NaN, NaN) when x is NaN,
+    fewer than min_obs prices are in the window, the window is constant or its variance is <= 0.
+    """
+    var = m2 / (count - 1) if count > 1 else 0.0
+    if np.isnan(x) or count < min_obs or run >= count or var <= 0.0:
+        return np.nan, np.nan
+    return x - total / count, np.sqrt(var)
+
+
+@njit(cache=True)
+def _window_mean(count, window, run, last, total):
+    """SMA from the rolling state: NaN until the window is full, exactly `last` for a constant window."""
+    if count < window:
+        return np.nan
+    if run >= count:
+        return last
+    return total / count
+
+
+@njit(cache=True)
+def _crossover_signal(s0, l0, s1, l1, s2, l2, prev_raw, prev_corrected):
+    """
+    One step of the SMA crossover rules (see _sma_crossover) from today's (s0, l0), yesterday's
+    (s1, l1) and the day before's (s2, l2) SMAs.
+
+    Returns:
+        tuple: (signal, raw, corrected) where raw/corrected are the step-1/step-2 signals to
+               pass back in as prev_raw/prev_corrected on the next day.
+    """
+    if s1 > l1 and s2 <= l2:
+        raw = 1
+    elif s1 < l1 and s2 >= l2:
+        raw = -1
+    else:
+        raw = 0
+    corrected = 0 if (prev_raw == 1 and s0 < l0) else raw
+    signal = 0 if (prev_corrected == -1 and s0 > l0) else corrected
+    return signal, raw, corrected
+
+
+@njit(cache=True)
+def _mean_reversion_signal(diff, std, entry_z, exit_z, prev_raw, prev_signal):
+    """
+    One day of the mean reversion rules from yesterday's deviation and std (z = diff / std,
+    compared as diff vs z * std; NaN std fails every comparison).
+
+    Entry: long (1) when z < -entry_z, short (-1) when z > entry_z (short wins if both hold).
+    Exit (simplified): signal=0 ("flatten position if held") when yesterday's entry signal was
+    long and z > -exit_z, or yesterday's signal after that rule was short and z < exit_z.
+    A stateful backtester would handle exits based on the actual position; these are triggers.
+
+    Returns:
+        tuple: (signal, raw, after_long_exit) where raw/after_long_exit are passed back in as
+               prev_raw/prev_signal on the next day.
+    """
+    entry_threshold = entry_z * std
+    exit_threshold = exit_z * std
+    if diff > entry_threshold:
+        raw = -1
+    elif diff < -entry_threshold:
+        raw = 1
+    else:
+        raw = 0
+    after_long_exit = 0 if (prev_raw == 1 and diff > -exit_threshold) else raw
+    signal = 0 if (prev_signal == -1 and diff < exit_threshold) else after_long_exit
+    return signal, raw, after_long_exit
+
+
+@njit(cache=True)
+def _mean_reversion_signals(diff, std, entry_z, exit_z, out):
+    """
+    Mean reversion signal loop over the rolling deviation/std from _rolling_deviation.
+
+    The signal for day i uses day i-1's deviation and std (no lookahead) and the previous day's
+    signals, all carried as scalars instead of shifted copies of the arrays.
+
+    Args:
+        diff (np.ndarray): float64 price - rolling mean.
+        std (np.ndarray): float64 rolling std (NaN where unusable), aligned with diff.
+        entry_z (float): Z-score magnitude that triggers an entry.
+        exit_z (float): Z-score magnitude at which a position is flattened.
+        out (np.ndarray): int8 array of len(diff), filled in place with the signals.
+    """
+    d = np.nan
+    sd = np.nan
+    prev_raw = 0
+    prev_signal = 0
+    for i in range(diff.shape[0]):
+        out[i], prev_raw, prev_signal = _mean_reversion_signal(d, sd, entry_z, exit_z, prev_raw, prev_signal)
+        d = diff[i]
+        sd = std[i]
+
+
+@njit(cache=True)
+def _rolling_deviation(prices, window, min_periods, out_diff, out_std):
+    """
+    Deviation of each price from its trailing `window`-day mean, and the rolling std (ddof=1).
+
+    The z-score is out_diff / out_std; it is left undivided so callers can compare the
+    deviation against threshold * std instead. One pass over the prices: the entering price
+    is added to, and the leaving price removed from, a compensated running sum (for the mean)
+    and a Welford M2 (for the variance), so each step is O(1) regardless of the window. This
+    follows the sliding updates pandas uses for rolling().mean()/.std(), with the given
+    min_periods (NaNs skipped, partial windows at the start). A window whose values are all
+    equal, or whose variance rounds to <= 0, gives NaN for both outputs (std 0 is not usable).
+
+    Args:
+        prices (np.ndarray): float32 (or float64) 'Adj Close' prices; the window sum and M2 are float64.
+        window (int): Rolling window length.
+        min_periods (int): Minimum number of non-NaN prices required in the window.
+        out_diff (np.ndarray): float64 array of len(prices), filled in place with price - mean.
+        out_std (np.ndarray): float64 array of len(prices), filled in place with the std.
+    """
+    n = prices.shape[0]
+    min_obs = max(min_periods, 2)  # the ddof=1 std needs at least two points
+    count = 0
+    # Kahan-compensated window sum (separate compensation terms for adds and removes)
+    total = 0.0
+    comp_sum_add = 0.0
+    comp_sum_remove = 0.0
+    # Welford mean/M2 with the same compensation scheme
+    mean = 0.0
+    m2 = 0.0
+    comp_add = 0.0
+    comp_remove = 0.0
+    # Length of the current run of identical prices, to detect constant windows exactly
+    run = 0
+    last = np.nan
+    for i in range(n):
+        if i >= window:
+            y = prices[i - window]
+            if not np.isnan(y):
+                count -= 1
+                total, comp_sum_remove = _kahan_add(total, comp_sum_remove, -y)
+                if count > 0:
+                    mean, m2, comp_remove = _welford_remove(mean, m2, comp_remove, count, y)
+                else:
+                    mean = 0.0
+                    m2 = 0.0
+        x = prices[i]
+        if not np.isnan(x):
+            run = run + 1 if x == last else 1
+            last = x
+            count += 1
+            total, comp_sum_add = _kahan_add(total, comp_sum_add, x)
+            mean, m2, comp_add = _welford_add(mean, m2, comp_add, count, x)
+        out_diff[i], out_std[i] = _deviation_and_std(x, count, min_obs, run, total, m2)
+
+
+@njit(cache=True)
+def _sma_crossover(prices, short_window, long_window, out):
+    """
+    SMA crossover signal loop with both rolling means kept as sliding sums.
+
+    Each step adds the entering price to, and removes the leaving price from, a compensated
+    running sum per window (the update pandas uses for rolling().mean(); a window of identical
+    prices gives exactly that price). The signal rules are applied in the same pass:
+      1. +1 if the short SMA crossed above the long SMA yesterday (above at i-1, not at i-2),
+         -1 if it crossed below (below at i-1, not at i-2), else 0.
+      2. 0 if yesterday's step-1 signal was +1 and today short < long.
+      3. 0 if yesterday's step-2 signal was -1 and today short > long.
+    SMAs need a full window of non-NaN prices; before that every comparison is False.
+
+    Args:
+        prices (np.ndarray): float32 (or float64) 'Adj Close' prices; both window sums are float64.
+        short_window (int): Short SMA window.
+        long_window (int): Long SMA window.
+        out (np.ndarray): int8 array of len(prices), filled in place with the signals.
+    """
+    n = prices.shape[0]
+    # Per-window state: non-NaN count, sum, and compensation terms for adds and removes
+    count_s = 0
+    sum_s = 0.0
+    add_s = 0.0
+    rem_s = 0.0
+    count_l = 0
+    sum_l = 0.0
+    add_l = 0.0
+    rem_l = 0.0
+    # Length of the current run of identical prices, to detect constant windows exactly
+    run = 0
+    last = np.nan
+    # SMAs one and two days back, and yesterday's signal after rules 1 and 2
+    s1 = np.nan
+    l1 = np.nan
+    s2 = np.nan
+    l2 = np.nan
+    prev_raw = 0
+    prev_corrected = 0
+    for i in range(n):
+        x = prices[i]
+        if i >= short_window:
+            y = prices[i - short_window]
+            if not np.isnan(y):
+                count_s -= 1
+                sum_s, rem_s = _kahan_add(sum_s, rem_s, -y)
+        if i >= long_window:
+            y = prices[i - long_window]
+            if not np.isnan(y):
+                count_l -= 1
+                sum_l, rem_l = _kahan_add(sum_l, rem_l, -y)
+        if not np.isnan(x):
+            run = run + 1 if x == last else 1
+            last = x
+            count_s += 1
+            sum_s, add_s = _kahan_add(sum_s, add_s, x)
+            count_l += 1
+            sum_l, add_l = _kahan_add(sum_l, add_l, x)
+
+        s0 = _window_mean(count_s, short_window, run, last, sum_s)
+        l0 = _window_mean(count_l, long_window, run, last, sum_l)
+        out[i], prev_raw, prev_corrected = _crossover_signal(s0, l0, s1, l1, s2, l2,
+                                                             prev_raw, prev_corrected)
+        s2 = s1
+        l2 = l1
+        s1 = s0
+        l1 = l0
+
+
+@njit(cache=True)
+def _rolling_mean(prices, window, out):
+    """
+    Rolling mean with min_periods=window, computed with the same sliding sums as _sma_crossover
+    (so the values match its internal SMAs exactly).
+
+    Args:
+        prices (np.ndarray): float32 (or float64) 'Adj Close' prices; the window sum is float64.
+        window (int): Rolling window length.
+        out (np.ndarray): float64 array of len(prices), filled in place (NaN until the window is full).
+    """
+    count = 0
+    total = 0.0
+    comp_add = 0.0
+    comp_remove = 0.0
+    run = 0
+    last = np.nan
+    for i in range(prices.shape[0]):
+        if i >= window:
+            y = prices[i - window]
+            if not np.isnan(y):
+                count -= 1
+                total, comp_remove = _kahan_add(total, comp_remove, -y)
+        x = prices[i]
+        if not np.isnan(x):
+            run = run + 1 if x == last else 1
+            last = x
+            count += 1
+            total, comp_add = _kahan_add(total, comp_add, x)
+        out[i] = _window_mean(count, window, run, last, total)
+
+
+@njit(cache=True)
+def _crossover_from_smas(short_sma, long_sma, out):
+    """
+    The _sma_crossover signal rules applied to precomputed short/long SMA arrays.
+
+    Args:
+        short_sma (np.ndarray): float64 short SMA (NaN until its window is full).
+        long_sma (np.ndarray): float64 long SMA, aligned with short_sma.
+        out (np.ndarray): int8 array of the same length, filled in place with the signals.
+    """
+    s1 = np.nan
+    l1 = np.nan
+    s2 = np.nan
+    l2 = np.nan
+    prev_raw = 0
+    prev_corrected = 0
+    for i in range(short_sma.shape[0]):
+        s0 = short_sma[i]
+        l0 = long_sma[i]
+        out[i], prev_raw, prev_corrected = _crossover_signal(s0, l0, s1, l1, s2, l2,
+                                                             prev_raw, prev_corrected)
+        s2 = s1
+        l2 = l1
+        s1 = s0
+        l1 = l0
+
+
+@njit(cache=True, parallel=True)
+def _precompute_features(prices, sma_windows, mr_windows, mr_min_periods, sma_out, diff_out, std_out):
+    """
+    Every rolling statistic the strategies need for one price series, one thread per statistic.
+
+    Args:
+        prices (np.ndarray): float32 (or float64) 'Adj Close' prices.
+        sma_windows (np.ndarray): int64 SMA windows; row k of sma_out gets the SMA for sma_windows[k].
+        mr_windows (np.ndarray): int64 mean reversion windows.
+        mr_min_periods (np.ndarray): int64 min_periods for each of mr_windows.
+        sma_out (np.ndarray): float64 (len(sma_windows), N) array, filled in place.
+        diff_out (np.ndarray): float64 (len(mr_windows), N) price - rolling mean, filled in place.
+        std_out (np.ndarray): float64 (len(mr_windows), N) rolling std, filled in place.
+    """
+    n_sma = sma_windows.shape[0]
+    for k in prange(n_sma + mr_windows.shape[0]):
+        if k < n_sma:
+            _rolling_mean(prices, sma_windows[k], sma_out[k])
+        else:
+            j = k - n_sma
+            _rolling_deviation(prices, mr_windows[j], mr_min_periods[j], diff_out[j], std_out[j])
+
+
+@njit(cache=True, parallel=True)
+def _momentum_batch(prices, window, out):
+    """
+    _momentum_signals applied to every column of a (N, K) price matrix, one thread per column.
+
+    Args:
+        prices (np.ndarray): Fortran-ordered float32 (N, K) prices, one column per series.
+        window (int): Momentum lookback window.
+        out (np.ndarray): Zero-initialized, Fortran-ordered int8 (N, K) array, filled in place.
+    """
+    for j in prange(prices.shape[1]):
+        _momentum_signals(prices[:, j], window, out[:, j])
+
+
+@njit(cache=True, parallel=True)
+def _mean_reversion_batch(prices, window, min_periods, entry_z, exit_z, out):
+    """
+    Mean reversion signals (_rolling_deviation + _mean_reversion_signals) for every column of a
+    (N, K) price matrix, one thread per column.
+
+    Args:
+        prices (np.ndarray): Fortran-ordered float32 (N, K) prices, one column per series.
+        window (int): Rolling window length.
+        min_periods (int): Minimum number of non-NaN prices required in the window.
+        entry_z (float): Z-score magnitude that triggers an entry.
+        exit_z (float): Z-score magnitude at which a position is flattened.
+        out (np.ndarray): Fortran-ordered int8 (N, K) array, filled in place with the signals.
+    """
+    n = prices.shape[0]
+    for j in prange(prices.shape[1]):
+        diff = np.empty(n)
+        std = np.empty(n)
+        _rolling_deviation(prices[:, j], window, min_periods, diff, std)
+        _mean_reversion_signals(diff, std, entry_z, exit_z, out[:, j])
+
+
+@njit(cache=True, parallel=True)
+def _sma_crossover_batch(prices, short_window, long_window, out):
+    """
+    _sma_crossover applied to every column of a (N, K) price matrix, one thread per column.
+
+    Args:
+        prices (np.ndarray): Fortran-ordered float32 (N, K) prices, one column per series.
+        short_window (int): Short SMA window.
+        long_window (int): Long SMA window.
+        out (np.ndarray): Fortran-ordered int8 (N, K) array, filled in place with the signals.
+    """
+    for j in prange(prices.shape[1]):
+        _sma_crossover(prices[:, j], short_window, long_window, out[:, j])
+
+
+@jitclass([('window', int64), ('min_obs', int64), ('entry_z', float64), ('exit_z', float64),
+           ('buffer', float64[:]), ('t', int64), ('count', int64),
+           ('total', float64), ('comp_sum_add', float64), ('comp_sum_remove', float64),
+           ('mean', float64), ('m2', float64), ('comp_add', float64), ('comp_remove', float64),
+           ('run', int64), ('last', float64), ('diff', float64), ('std', float64),
+           ('prev_raw', int64), ('prev_signal', int64)])
+class _MeanReversionState:
+    """
+    Incremental mean reversion signals: update(price) returns today's signal in O(1).
+
+    Keeps the last `window` prices in a ring buffer together with the same rolling sums as
+    _rolling_deviation, so feeding a price series through update() one bar at a time gives
+    exactly MeanReversionStrategy(...).generate_signals() on that series (prices are rounded
+    to float32 like Strategy._adj_close, and the min_periods rule is the same int(0.8*window)).
+    """
+    def __init__(self, window, entry_z, exit_z):
+        self.window = window
+        self.min_obs = max(int(window * 0.8), 2)
+        self.entry_z = entry_z
+        self.exit_z = exit_z
+        self.buffer = np.full(window, np.nan)
+        self.t = 0
+        self.count = 0
+        self.total = 0.0
+        self.comp_sum_add = 0.0
+        self.comp_sum_remove = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.run = 0
+        self.last = np.nan
+        # Yesterday's deviation/std, entry signal and signal after the long exits
+        self.diff = np.nan
+        self.std = np.nan
+        self.prev_raw = 0
+        self.prev_signal = 0
+
+    def update(self, price):
+        """Adds today's price; returns today's signal (decided from yesterday's z-score)."""
+        # Today's signal only uses yesterday's state (no lookahead)
+        signal, self.prev_raw, self.prev_signal = _mean_reversion_signal(self.diff, self.std, self.entry_z, self.exit_z,
+                                                                         self.prev_raw, self.prev_signal)
+
+        # Slide the window: drop the price from `window` days ago, add today's
+        slot = self.t % self.window
+        if self.t >= self.window:
+            y = self.buffer[slot]
+            if not np.isnan(y):
+                self.count -= 1
+                self.total, self.comp_sum_remove = _kahan_add(self.total, self.comp_sum_remove, -y)
+                if self.count > 0:
+                    self.mean, self.m2, self.comp_remove = _welford_remove(self.mean, self.m2, self.comp_remove,
+                                                                           self.count, y)
+                else:
+                    self.mean = 0.0
+                    self.m2 = 0.0
+        x = np.float64(np.float32(price))
+        self.buffer[slot] = x
+        self.t += 1
+        if not np.isnan(x):
+            self.run = self.run + 1 if x == self.last else 1
+            self.last = x
+            self.count += 1
+            self.total, self.comp_sum_add = _kahan_add(self.total, self.comp_sum_add, x)
+            self.mean, self.m2, self.comp_add = _welford_add(self.mean, self.m2, self.comp_add, self.count, x)
+        self.diff, self.std = _deviation_and_std(x, self.count, self.min_obs, self.run, self.total, self.m2)
+        return signal
+
+
+@jitclass([('short_window', int64), ('long_window', int64), ('buffer', float64[:]), ('t', int64),
+           ('count_s', int64), ('sum_s', float64), ('add_s', float64), ('rem_s', float64),
+           ('count_l', int64), ('sum_l', float64), ('add_l', float64), ('rem_l', float64),
+           ('run', int64), ('last', float64),
+           ('s1', float64), ('l1', float64), ('s2', float64), ('l2', float64),
+           ('prev_raw', int64), ('prev_corrected', int64)])
+class _SMACrossoverState:
+    """
+    Incremental SMA crossover signals: update(price) returns today's signal in O(1).
+
+    The last `long_window` prices are kept in a ring buffer, which also holds the price leaving
+    the short window. Feeding a price series through update() one bar at a time gives exactly
+    SMACrossoverStrategy(...).generate_signals() on that series (prices rounded to float32).
+    """
+    def __init__(self, short_window, long_window):
+        self.short_window = short_window
+        self.long_window = long_window
+        self.buffer = np.full(long_window, np.nan)
+        self.t = 0
+        self.count_s = 0
+        self.sum_s = 0.0
+        self.add_s = 0.0
+        self.rem_s = 0.0
+        self.count_l = 0
+        self.sum_l = 0.0
+        self.add_l = 0.0
+        self.rem_l = 0.0
+        self.run = 0
+        self.last = np.nan
+        self.s1 = np.nan
+        self.l1 = np.nan
+        self.s2 = np.nan
+        self.l2 = np.nan
+        self.prev_raw = 0
+        self.prev_corrected = 0
+
+    def update(self, price):
+        """Adds today's price; returns today's signal."""
+        t = self.t
+        if t >= self.short_window:
+            y = self.buffer[(t - self.short_window) % self.long_window]
+            if not np.isnan(y):
+                self.count_s -= 1
+                self.sum_s, self.rem_s = _kahan_add(self.sum_s, self.rem_s, -y)
+        slot = t % self.long_window
+        if t >= self.long_window:
+            y = self.buffer[slot]
+            if not np.isnan(y):
+                self.count_l -= 1
+                self.sum_l, self.rem_l = _kahan_add(self.sum_l, self.rem_l, -y)
+        x = np.float64(np.float32(price))
+        self.buffer[slot] = x
+        self.t = t + 1
+        if not np.isnan(x):
+            self.run = self.run + 1 if x == self.last else 1
+            self.last = x
+            self.count_s += 1
+            self.sum_s, self.add_s = _kahan_add(self.sum_s, self.add_s, x)
+            self.count_l += 1
+            self.sum_l, self.add_l = _kahan_add(self.sum_l, self.add_l, x)
+
+        s0 = _window_mean(self.count_s, self.short_window, self.run, self.last, self.sum_s)
+        l0 = _window_mean(self.count_l, self.long_window, self.run, self.last, self.sum_l)
+        signal, self.prev_raw, self.prev_corrected = _crossover_signal(s0, l0, self.s1, self.l1, self.s2, self.l2,
+                                                                       self.prev_raw, self.prev_corrected)
+        self.s2 = self.s1
+        self.l2 = self.l1
+        self.s1 = s0
+        self.l1 = l0
+        return signal
+
+
+def _warm_up():
+    """
+    Compiles the strategy kernels for the argument types the strategies pass in.
+
+    With cache=True the compiled code is written to __pycache__ on the first import and only
+    loaded from there afterwards, so a single backtest does not pay the JIT compile time.
+    """
+    prices = np.linspace(100.0, 110.0, 64, dtype=np.float32)
+    prices.setflags(write=False)  # Strategy._adj_close is read-only float32
+    signals = np.zeros(64, dtype=np.int8)
+    _momentum_signals(prices, 10, signals)
+    _sma_crossover(prices, 5, 10, signals)
+    diff, std = np.empty(64), np.empty(64)
+    _rolling_deviation(prices, 10, 8, diff, std)
+    _mean_reversion_signals(diff, std, 1.5, 0.5, signals)
+
+
+try:
+    _warm_up()
+except Exception as e:  # Compilation is retried lazily on first use
+    print(f"Warning: Numba kernel warm-up failed: {e}")
@@ -1,7 +1,13 @@
-import pandas as pd
 import numpy as np
+from collections import namedtuple
 
-def run_backtest(data, signals, initial_capital=100000.0, allow_shorting=False):
+from src._kernels import _backtest_core
+
+# Lightweight backtest output: numpy arrays (plus the date index) instead of a DataFrame.
+BacktestResult = namedtuple('BacktestResult',
+                            'equity_curve strategy_return position cumulative_market cumulative_strategy index')
+
+def run_backtest(data, signals, initial_capital=100000.0, allow_shorting=False, assume_aligned=False):
     """
     Runs a simple vectorized backtest, handling long and optional short positions.
 
@@ -11,10 +17,12 @@ def run_backtest(data, signals, initial_capital=100000.0, allow_shorting=False):
                                 Index must align with data.
         initial_capital (float): Starting capital for the backtest.
         allow_shorting (bool): Whether short positions are allowed.
+        assume_aligned (bool): Skip index alignment when the caller guarantees that signals
+                               share data's index (e.g. signals generated from `data` itself).
 
     Returns:
-        pd.DataFrame: Portfolio DataFrame containing equity curve and positions.
-                      Returns None if inputs are invalid.
+        BacktestResult: Equity curve, strategy returns, positions and cumulative curves as
+                        numpy arrays, plus the date index. Returns None if inputs are invalid.
     """
     if data is None or signals is None or data.empty or signals.empty:
         # print("Error: Backtester received invalid data or signals.") # Reduced verbosity
@@ -26,50 +34,74 @@ def run_backtest(data, signals, initial_capital=100000.0, allow_shorting=False):
         print("Error: Backtester requires 'signal' column in signals.")
         return None
 
-    # Align data and signals strictly on index
-    common_index = data.index.intersection(signals.index)
-    if common_index.empty:
-        print("Error: Data and Signal indices have no overlap.")
-        return None
-    data = data.loc[common_index]
-    signals = signals.loc[common_index]
+    if assume_aligned:
+        if len(data) != len(signals):
+            print("Error: assume_aligned=True but data and signals have different lengths.")
+            return None
+    else:
+        # Align data and signals strictly on index
+        common_index = data.index.intersection(signals.index)
+        if common_index.empty:
+            print("Error: Data and Signal indices have no overlap.")
+            return None
+        data = data.loc[common_index]
+        signals = signals.loc[common_index]
 
     # print("Starting backtest...") # Reduced verbosity
-    portfolio = pd.DataFrame(index=data.index)
-    portfolio['Adj Close'] = data['Adj Close']
-    portfolio['signal'] = signals['signal'] # Signal for decision *today*
-    portfolio['position'] = 0.0 # Position held *during* the day, decided based on *yesterday's* signal
-    portfolio['market_return'] = portfolio['Adj Close'].pct_change().fillna(0.0)
-
-    # --- Determine Positions based on previous day's signal ---
-    # Shift signals by 1 day: Use yesterday's signal to determine today's position holding
-    shifted_signal = portfolio['signal'].shift(1).fillna(0.0)
-
-    # Apply position logic
-    portfolio['position'] = shifted_signal.apply(lambda x: 1.0 if x > 0 else (-1.0 if x < 0 and allow_shorting else 0.0))
-
-    # --- Calculate Strategy Returns ---
-    # Strategy return for day 't' is the position held *during* day 't' times the market return *of* day 't'.
-    # The position held during day 't' was determined by the signal generated at the end of day 't-1'.
-    portfolio['strategy_return'] = portfolio['position'] * portfolio['market_return']
-    portfolio['strategy_return'].fillna(0.0, inplace=True) # Fill NaN for the first day
-
-    # --- Calculate Cumulative Returns and Equity Curve ---
-    portfolio['cumulative_market'] = (1 + portfolio['market_return']).cumprod()
-    portfolio['cumulative_strategy'] = (1 + portfolio['strategy_return']).cumprod()
-    portfolio['equity_curve'] = initial_capital * portfolio['cumulative_strategy']
-
-    # Remove initial rows where signals/positions might be NaN due to rolling windows/shifting
-    first_valid_index = portfolio['strategy_return'].first_valid_index()
-    if first_valid_index is not None:
-         portfolio = portfolio.loc[first_valid_index:]
-    else:
-         print("Warning: No valid strategy returns generated.")
-         return None # No valid data points after processing
+    # --- Run the fused numeric core on raw arrays ---
+    # Position held *during* day 't' is decided by the signal generated at the end of day 't-1';
+    # strategy return for day 't' is that position times the market return *of* day 't'.
+    px = np.ascontiguousarray(data['Adj Close'].to_numpy(dtype=np.float64))
+    sig = np.ascontiguousarray(signals['signal'].fillna(0.0).to_numpy(dtype=np.float64))
+    position, market_return, strategy_return, cumulative_market, cumulative_strategy = \
+        _backtest_core(px, sig, bool(allow_shorting))
 
-    if portfolio.empty:
-        # print("Warning: Portfolio became empty after removing initial NaNs.") # Reduced verbosity
+    # No rows need trimming: the core counts missing/non-finite market returns as 0, so every
+    # strategy return is finite
+
+    # print(f"Backtest completed. Final portfolio value: ${initial_capital * cumulative_strategy[-1]:,.2f}") # Reduced verbosity
+    return BacktestResult(equity_curve=initial_capital * cumulative_strategy,
+                          strategy_return=strategy_return,
+                          position=position, # Position held *during* the day, decided based on *yesterday's* signal
+                          cumulative_market=cumulative_market,
+                          cumulative_strategy=cumulative_strategy,
+                          index=data.index)
+
+
+def run_backtest_batch(mret, signals, allow_shorting, initial_capital=100000.0, index=None):
+    """
+    Backtests K signal columns at once with column-wise NumPy operations.
+
+    Each column is one combination; the same position/return rules as run_backtest are
+    applied with broadcasting instead of K separate backtests.
+
+    Args:
+        mret (np.ndarray): Daily market returns, shape (N,) (mret[0] == 0).
+        signals (np.ndarray): Signals, shape (N, K), already aligned with mret.
+        allow_shorting (array-like of bool): Per-column shorting flag, shape (K,).
+        initial_capital (float): Starting capital for every column.
+        index (pd.Index, optional): Dates of the N rows, attached to the result.
+
+    Returns:
+        BacktestResult: Fields are (N, K) arrays (cumulative_market is (N,)).
+                        Returns None if inputs are invalid.
+    """
+    if mret is None or signals is None or signals.ndim != 2 or signals.shape[0] != len(mret) or len(mret) == 0:
         return None
+    allow_shorting = np.asarray(allow_shorting, dtype=bool)
+    if allow_shorting.shape != (signals.shape[1],):
+        return None
+
+    # Position held during day t is decided by the signal of day t-1 (flat on the first day)
+    shifted = np.zeros_like(signals, dtype=mret.dtype)
+    shifted[1:] = np.nan_to_num(signals[:-1], nan=0.0)
+    position = np.where(shifted > 0, 1.0, np.where((shifted < 0) & allow_shorting[None, :], -1.0, 0.0)).astype(mret.dtype)
 
-    # print(f"Backtest completed. Final portfolio value: ${portfolio['equity_curve'].iloc[-1]:,.2f}") # Reduced verbosity
-    return portfolio
\ No newline at end of file
+    strategy_return = position * mret[:, None]
+    cumulative_strategy = np.cumprod(1.0 + strategy_return.astype(np.float64), axis=0)
+    return BacktestResult(equity_curve=initial_capital * cumulative_strategy,
+                          strategy_return=strategy_return,
+                          position=position,
+                          cumulative_market=np.cumprod(1.0 + mret.astype(np.float64)),
+                          cumulative_strategy=cumulative_strategy,
+                          index=index)
@@ -3,10 +3,11 @@ import os
 
 def load_data(filepath):
     """
-    Loads historical stock data from a CSV file.
+    Loads historical stock data from a Parquet or CSV file.
 
     Args:
-        filepath (str): The path to the CSV file.
+        filepath (str): The path to the data file. Files ending in '.parquet' are read
+                        with pd.read_parquet; anything else is parsed as CSV.
                         Expected columns: 'Date', 'Adj Close'.
                         'Date' should be the index or the first column.
 
@@ -19,8 +20,12 @@ def load_data(filepath):
         return None
 
     try:
-        # Try reading with 'Date' as the first column to be parsed as index
-        df = pd.read_csv(filepath, index_col='Date', parse_dates=True)
+        if filepath.lower().endswith('.parquet'):
+            # Parquet keeps the datetime dtype, so no date parsing is needed
+            df = pd.read_parquet(filepath, columns=['Date', 'Adj Close']).set_index('Date')
+        else:
+            # Try reading with 'Date' as the first column to be parsed as index
+            df = pd.read_csv(filepath, index_col='Date', parse_dates=True)
 
         if 'Adj Close' not in df.columns:
             print("Error: 'Adj Close' column not found in the data.")
@@ -1,97 +1,97 @@
+import math
 import numpy as np
 import pandas as pd
 
-# ... (keep calculate_cagr, calculate_sharpe, calculate_sortino, calculate_max_drawdown, calculate_calmar as before) ...
-def calculate_cagr(portfolio_value):
-    """Calculates Compound Annual Growth Rate (CAGR)."""
-    if portfolio_value is None or portfolio_value.empty or len(portfolio_value) < 2: return np.nan
-    start_value = portfolio_value.iloc[0]
-    end_value = portfolio_value.iloc[-1]
-    # Ensure start_value is not zero or negative before proceeding
-    if start_value <= 0: return np.nan
+from src._kernels import _return_moments, _drawdown_stats
+from src.backtester import BacktestResult
 
-    start_date = portfolio_value.index[0]
-    end_date = portfolio_value.index[-1]
-    num_years = (end_date - start_date).days / 365.25
+# --- NumPy implementations (operate on clean float64 arrays, no pandas per-op overhead) ---
+def _clean_array(values):
+    """Coerces a Series/array to a float64 numpy array and drops NaNs."""
+    arr = pd.to_numeric(np.asarray(values).ravel(), errors='coerce').astype(np.float64, copy=False)
+    return arr[~np.isnan(arr)]
 
+def _cagr_np(start_value, end_value, num_years):
+    """CAGR from the first/last equity values and the elapsed time in years."""
+    # Ensure start_value is not zero or negative before proceeding
+    if not start_value > 0: return np.nan
     if num_years <= 0: return np.nan # Avoid issues with very short periods
+    # A negative (or NaN) end value has no real-valued annualized growth rate
+    if not end_value >= 0: return np.nan
+    if end_value == 0: return -1.0 # Total loss
+
+    # (end/start)**(1/years) - 1, written as expm1(log(.)/years): cheaper than a fractional
+    # pow and more accurate when the growth factor is close to 1
+    return math.expm1(math.log(end_value / start_value) / num_years)
+
+# --- Ratio rules, shared by the single-metric functions and the metrics dicts ---
+def _sharpe_ratio(n, mean_excess_return, std_dev):
+    """Annualized Sharpe Ratio from the count, mean and (ddof=1) std of the excess returns."""
+    if n < 2 or std_dev == 0 or np.isnan(std_dev):
+        return np.nan # Avoid division by zero or NaN std dev
+    return mean_excess_return / std_dev * np.sqrt(252) # Assuming daily returns
+
+def _sortino_ratio(n, mean_excess_return, downside_deviation):
+    """Annualized Sortino Ratio from the excess return count/mean and the downside deviation."""
+    if n < 2: return np.nan
+    if downside_deviation == 0 or np.isnan(downside_deviation):
+        # No (or zero) downside: ratio is infinite if mean excess return is positive, else undefined
+        return np.inf if mean_excess_return > 0 else np.nan
+    return mean_excess_return / downside_deviation * np.sqrt(252) # Assuming daily returns
+
+def _max_drawdown_value(n_equity, max_drawdown, non_positive):
+    """Maximum Drawdown from the equity point count, deepest drawdown and non-positive flag."""
+    if n_equity < 2: return np.nan
+    if non_positive:
+        print("Warning: Non-positive portfolio values found. Max Drawdown calculation might be unreliable.")
+        # Decide handling: return NaN, or try to proceed? Let's return NaN for safety.
+        return np.nan
+    return max_drawdown # Min value represents the largest percentage drop
+
+def _sharpe_np(returns, risk_free_rate=0.0):
+    """Annualized Sharpe Ratio of a float64 daily return array (NaNs skipped)."""
+    n, mean, std, _, _ = _return_moments(returns.reshape(-1, 1), risk_free_rate / 252)
+    return _sharpe_ratio(n[0], mean[0], std[0])
 
-    # Use np.sign to handle potential negative end_value gracefully in calculation if needed, though unlikely with equity curves
-    cagr = (np.sign(end_value) * np.abs(end_value / start_value)) ** (1 / num_years) - 1
-    # Handle potential complex numbers if end_value was negative and num_years fractional in a weird way
-    if isinstance(cagr, complex):
-        return np.nan # Or handle appropriately
-    return cagr
+def _sortino_np(returns, risk_free_rate=0.0):
+    """Annualized Sortino Ratio of a float64 daily return array (NaNs skipped)."""
+    n, mean, _, _, std_down = _return_moments(returns.reshape(-1, 1), risk_free_rate / 252)
+    return _sortino_ratio(n[0], mean[0], std_down[0])
+
+def _max_drawdown_np(portfolio_value):
+    """Maximum Drawdown of a float64 equity array (NaNs skipped)."""
+    n_equity, max_drawdown, non_positive = _drawdown_stats(portfolio_value.reshape(-1, 1))
+    return _max_drawdown_value(n_equity[0], max_drawdown[0], non_positive[0])
+
+def _num_years(index):
+    """Elapsed time between the first and last index dates, in years."""
+    return (index[-1] - index[0]).days / 365.25
+
+
+# --- Public Series-based API ---
+def calculate_cagr(portfolio_value):
+    """Calculates Compound Annual Growth Rate (CAGR)."""
+    if portfolio_value is None or portfolio_value.empty or len(portfolio_value) < 2: return np.nan
+    return _cagr_np(portfolio_value.iloc[0], portfolio_value.iloc[-1], _num_years(portfolio_value.index))
 
 def calculate_sharpe(returns, risk_free_rate=0.0):
     """Calculates annualized Sharpe Ratio."""
     if returns is None or len(returns) < 2: return np.nan
     # Ensure returns is numeric and handle potential NaNs before std calculation
-    returns = pd.to_numeric(returns, errors='coerce').dropna()
-    if len(returns) < 2: return np.nan
-
-    excess_returns = returns - risk_free_rate / 252 # Daily risk-free rate
-    mean_excess_return = excess_returns.mean()
-    std_dev = excess_returns.std()
-
-    if std_dev is None or std_dev == 0 or pd.isna(std_dev):
-        return np.nan # Avoid division by zero or NaN std dev
-
-    sharpe_ratio = mean_excess_return / std_dev
-    annualized_sharpe = sharpe_ratio * np.sqrt(252) # Assuming daily returns
-    return annualized_sharpe
+    return _sharpe_np(_clean_array(returns), risk_free_rate)
 
 def calculate_sortino(returns, risk_free_rate=0.0):
     """Calculates annualized Sortino Ratio."""
     if returns is None or len(returns) < 2: return np.nan
     # Ensure returns is numeric and handle potential NaNs
-    returns = pd.to_numeric(returns, errors='coerce').dropna()
-    if len(returns) < 2: return np.nan
-
-    excess_returns = returns - risk_free_rate / 252
-
-    # Calculate downside deviation (std dev of negative excess returns)
-    negative_excess_returns = excess_returns[excess_returns < 0]
-
-    if negative_excess_returns.empty:
-        # If no downside returns, Sortino is arguably infinite (or very high)
-        # Check if mean excess return is positive, if so, return large number, else NaN
-        if excess_returns.mean() > 0:
-            return np.inf
-        else:
-            return np.nan
-
-    downside_deviation = negative_excess_returns.std()
-
-    if downside_deviation is None or downside_deviation == 0 or pd.isna(downside_deviation):
-        # If downside deviation is zero (and mean return > 0), ratio is infinite
-        if excess_returns.mean() > 0:
-            return np.inf
-        else:
-             return np.nan # Avoid division by zero if mean is also zero/negative
-
-    sortino_ratio = excess_returns.mean() / downside_deviation
-    annualized_sortino = sortino_ratio * np.sqrt(252) # Assuming daily returns
-    return annualized_sortino
+    return _sortino_np(_clean_array(returns), risk_free_rate)
 
 
 def calculate_max_drawdown(portfolio_value):
     """Calculates Maximum Drawdown."""
-    if portfolio_value is None or portfolio_value.empty or len(portfolio_value) < 2: return np.nan
+    if portfolio_value is None or len(portfolio_value) < 2: return np.nan
     # Ensure values are numeric
-    portfolio_value = pd.to_numeric(portfolio_value, errors='coerce').dropna()
-    if len(portfolio_value) < 2: return np.nan
-    if (portfolio_value <= 0).any():
-        print("Warning: Non-positive portfolio values found. Max Drawdown calculation might be unreliable.")
-        # Decide handling: return NaN, or try to proceed? Let's return NaN for safety.
-        return np.nan
-
-    cumulative_returns = portfolio_value / portfolio_value.iloc[0] # Normalize to 1
-    running_max = cumulative_returns.cummax()
-    drawdown = (cumulative_returns - running_max) / running_max
-    max_drawdown = drawdown.min() # Min value represents the largest percentage drop
-
-    return max_drawdown
+    return _max_drawdown_np(_clean_array(portfolio_value))
 
 
 def calculate_calmar(cagr, max_drawdown):
@@ -106,38 +106,93 @@ def calculate_calmar(cagr, max_drawdown):
 
 
 def calculate_performance_metrics(portfolio, risk_free_rate=0.0):
-    """Calculates and returns a dictionary of key performance metrics."""
+    """
+    Calculates and returns a dictionary of key performance metrics.
+
+    `portfolio` may be a BacktestResult (arrays, as returned by run_backtest) or a
+    DataFrame with 'equity_curve', 'strategy_return' and 'position' columns.
+    """
     metrics = {} # Initialize empty dict
 
-    if portfolio is None or portfolio.empty or 'equity_curve' not in portfolio or 'strategy_return' not in portfolio:
-        print("Warning: Cannot calculate metrics on invalid or empty portfolio DataFrame.")
+    if isinstance(portfolio, BacktestResult):
+        invalid = portfolio.equity_curve is None or portfolio.strategy_return is None
+    else:
+        invalid = portfolio is None or portfolio.empty or 'equity_curve' not in portfolio or 'strategy_return' not in portfolio
+    if invalid:
+        print("Warning: Cannot calculate metrics on invalid or empty portfolio.")
         # Return dict with NaNs
         keys = ['CAGR', 'Annualized Sharpe Ratio', 'Annualized Sortino Ratio', 'Max Drawdown', 'Calmar Ratio', 'Cumulative Return', 'Annualized Volatility']
         for k in keys: metrics[k] = np.nan
         return metrics
 
-    equity_curve = portfolio['equity_curve']
-    strategy_returns = portfolio['strategy_return']
-
-    if equity_curve.empty or strategy_returns.empty:
+    # Pull the columns out as numpy arrays once; everything below is pure NumPy
+    index = portfolio.index
+    if isinstance(portfolio, BacktestResult):
+        equity_curve = np.asarray(portfolio.equity_curve, dtype=np.float64)
+        strategy_returns = np.asarray(portfolio.strategy_return, dtype=np.float64)
+        position = np.asarray(portfolio.position, dtype=np.float64)
+    else:
+        equity_curve = portfolio['equity_curve'].to_numpy(dtype=np.float64)
+        strategy_returns = portfolio['strategy_return'].to_numpy(dtype=np.float64)
+        position = portfolio['position'].to_numpy(dtype=np.float64)
+
+    if equity_curve.size == 0 or strategy_returns.size == 0:
          print("Warning: Equity curve or strategy returns are empty.")
          keys = ['CAGR', 'Annualized Sharpe Ratio', 'Annualized Sortino Ratio', 'Max Drawdown', 'Calmar Ratio', 'Cumulative Return', 'Annualized Volatility']
          for k in keys: metrics[k] = np.nan
          return metrics
 
-
     # print("\nCalculating performance metrics...") # Reduced verbosity
 
-    metrics['CAGR'] = calculate_cagr(equity_curve)
-    metrics['Annualized Sharpe Ratio'] = calculate_sharpe(strategy_returns, risk_free_rate)
-    metrics['Annualized Sortino Ratio'] = calculate_sortino(strategy_returns, risk_free_rate)
-    metrics['Max Drawdown'] = calculate_max_drawdown(equity_curve)
-    metrics['Calmar Ratio'] = calculate_calmar(metrics['CAGR'], metrics['Max Drawdown'])
-
-    # Add some other basic stats
-    metrics['Cumulative Return'] = (equity_curve.iloc[-1] / equity_curve.iloc[0]) - 1 if not equity_curve.empty and equity_curve.iloc[0] != 0 else np.nan
-    metrics['Annualized Volatility'] = strategy_returns.std() * np.sqrt(252) if not strategy_returns.empty else np.nan
-    metrics['Total Trades'] = portfolio['position'].diff().fillna(0).abs().sum() / 2 # Estimate trades
+    # Same reductions as the batch path, on a single (N, 1) column
+    num_years = _num_years(index) if index is not None and len(index) > 0 else np.nan
+    metrics = _metrics_by_column(equity_curve[:, None], strategy_returns[:, None], position[:, None],
+                                 num_years, risk_free_rate)[0]
 
     # print("Performance metrics calculated.") # Reduced verbosity
-    return metrics
\ No newline at end of file
+    return metrics
+
+
+def _metrics_by_column(equity_curve, strategy_returns, position, num_years, risk_free_rate):
+    """Builds one metrics dict per column of (N, K) equity, return and position arrays."""
+    # One pass over each array (see src/_kernels.py)
+    n, mean_excess_return, std_dev, _, downside_deviation = _return_moments(strategy_returns, risk_free_rate / 252)
+    n_equity, max_drawdown, non_positive = _drawdown_stats(equity_curve)
+    total_trades = 0.5 * np.nansum(np.abs(np.diff(position, axis=0)), axis=0) # Estimate trades
+
+    results = []
+    for j in range(equity_curve.shape[1]):
+        start_value = equity_curve[0, j]
+        end_value = equity_curve[-1, j]
+        metrics = {}
+        # CAGR needs the dates; array results without an index get NaN
+        metrics['CAGR'] = _cagr_np(start_value, end_value, num_years) \
+            if equity_curve.shape[0] >= 2 and not np.isnan(num_years) else np.nan
+        metrics['Annualized Sharpe Ratio'] = _sharpe_ratio(n[j], mean_excess_return[j], std_dev[j])
+        metrics['Annualized Sortino Ratio'] = _sortino_ratio(n[j], mean_excess_return[j], downside_deviation[j])
+        metrics['Max Drawdown'] = _max_drawdown_value(n_equity[j], max_drawdown[j], non_positive[j])
+        metrics['Calmar Ratio'] = calculate_calmar(metrics['CAGR'], metrics['Max Drawdown'])
+
+        # Add some other basic stats (std is shift-invariant, so excess-return std == raw-return std)
+        metrics['Cumulative Return'] = (end_value / start_value) - 1 if start_value != 0 else np.nan
+        metrics['Annualized Volatility'] = std_dev[j] * np.sqrt(252) if n[j] > 1 else np.nan
+        metrics['Total Trades'] = total_trades[j]
+        results.append(metrics)
+    return results
+
+
+def calculate_performance_metrics_batch(result, risk_free_rate=0.0):
+    """
+    Calculates performance metrics for every column of a batched BacktestResult.
+
+    Same metrics and edge-case rules as calculate_performance_metrics (the same code, run
+    over all K columns of the (N, K) arrays from run_backtest_batch at once).
+
+    Returns:
+        list: One metrics dict per column.
+    """
+    # float32 returns go to the kernel as-is; it accumulates in float64
+    equity_curve = np.asarray(result.equity_curve, dtype=np.float64)
+    num_years = _num_years(result.index) if result.index is not None and len(result.index) > 0 else np.nan
+    return _metrics_by_column(equity_curve, np.asarray(result.strategy_return), np.asarray(result.position),
+                              num_years, risk_free_rate)
@@ -1,17 +1,49 @@
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import os
+import pandas as pd
 
-def plot_equity_curve(portfolio, title='Strategy Performance', filename=None):
+from src.backtester import BacktestResult
+
+# Figure/axes shared by every plot_equity_curve call, created on first use
+_FIG, _AX = None, None
+
+def _get_axes():
+    """Returns the shared (figure, axes), recreating them if the figure was closed."""
+    global _FIG, _AX
+    if _FIG is None or not plt.fignum_exists(_FIG.number):
+        _FIG, _AX = plt.subplots(figsize=(14, 8)) # Slightly larger plot
+        _FIG.set_layout_engine('constrained') # Keeps labels and annotations from overlapping
+    return _FIG, _AX
+
+def _as_frame(portfolio):
+    """Adapts a BacktestResult to the DataFrame layout used below; DataFrames pass through."""
+    if not isinstance(portfolio, BacktestResult):
+        return portfolio
+    columns = {'equity_curve': portfolio.equity_curve,
+               'cumulative_strategy': portfolio.cumulative_strategy,
+               'cumulative_market': portfolio.cumulative_market}
+    return pd.DataFrame({k: v for k, v in columns.items() if v is not None}, index=portfolio.index)
+
+def plot_equity_curve(portfolio, title='Strategy Performance', filename=None, dpi=100):
     """
     Plots the equity curve against the benchmark (market).
     Optionally saves the plot to a file.
+
+    `portfolio` may be a BacktestResult or a portfolio DataFrame.
+    `dpi` is the resolution of the saved file; screen resolution is enough for
+    reports, pass 300 only for publication output.
     """
-    if portfolio is None or portfolio.empty:
+    if portfolio is None:
+        print("Warning: Cannot plot empty portfolio.")
+        return
+    portfolio = _as_frame(portfolio)
+    if portfolio.empty:
         print("Warning: Cannot plot empty portfolio.")
         return
 
-    fig, ax = plt.subplots(figsize=(14, 8)) # Slightly larger plot
+    fig, ax = _get_axes()
+    ax.clear()
 
     # Plot Equity Curve
     ax.plot(portfolio.index, portfolio['equity_curve'], label='Strategy Equity', color='blue', linewidth=1.5)
@@ -51,8 +83,6 @@ def plot_equity_curve(portfolio, title='Strategy Performance', filename=None):
                 bbox=dict(boxstyle='round,pad=0.3', fc='lightgrey', alpha=0.5))
 
 
-    plt.tight_layout() # Adjust layout to prevent labels overlapping
-
     # Save the plot if filename is provided
     if filename:
         try:
@@ -60,9 +90,8 @@ def plot_equity_curve(portfolio, title='Strategy Performance', filename=None):
             plot_dir = os.path.dirname(filename)
             if plot_dir and not os.path.exists(plot_dir):
                 os.makedirs(plot_dir)
-            plt.savefig(filename, dpi=300, bbox_inches='tight')
-            print(f"Plot saved to {filename}")
-            plt.close(fig) # Close the plot window after saving
+            fig.savefig(filename, dpi=dpi)
+            print(f"Plot saved to {filename}") # Figure is kept open for the next call
         except Exception as e:
             print(f"Error saving plot to {filename}: {e}")
             plt.show() # Show plot if saving failed
@@ -1,25 +1,93 @@
+import logging
+from collections import namedtuple
+
 import pandas as pd
 import numpy as np
 
+from src._kernels import (_momentum_signals, _rolling_deviation, _mean_reversion_signals, _sma_crossover,
+                          _momentum_batch, _mean_reversion_batch, _sma_crossover_batch,
+                          _MeanReversionState, _SMACrossoverState,
+                          _precompute_features, _crossover_from_smas)
+
+logger = logging.getLogger(__name__)
+
+def _as_price_matrix(prices_2d):
+    """
+    Validates a (N, K) price matrix (one column per series) for the batch kernels.
+
+    The matrix is made Fortran-ordered: each prange thread walks one column, which is then
+    contiguous instead of strided by K.
+    """
+    prices = np.asfortranarray(prices_2d, dtype=np.float32)
+    if prices.ndim != 2 or prices.shape[0] == 0:
+        raise ValueError(f"Expected a non-empty 2-D (N, K) price array, got shape {prices.shape}.")
+    return prices
+
+# Rolling statistics shared across strategies on the same series (see precompute_features):
+# sma maps window -> rolling mean array, deviation maps window -> (price - rolling mean, rolling std).
+Features = namedtuple('Features', 'sma deviation')
+
+def precompute_features(data, sma_windows=(), mr_windows=()):
+    """
+    Computes the rolling statistics of several strategies on one price series in a single call.
+
+    Each statistic runs on its own thread in one parallel kernel launch, and every distinct
+    window is computed once however many strategies use it. Pass the result as `features=`
+    to MeanReversionStrategy / SMACrossoverStrategy built on the same `data`.
+
+    Args:
+        data (pd.DataFrame): DataFrame with 'Adj Close' (the frame the strategies will use).
+        sma_windows (iterable): SMA windows (short and long) for SMACrossoverStrategy.
+        mr_windows (iterable): Rolling windows for MeanReversionStrategy.
+
+    Returns:
+        Features: The SMAs and mean reversion deviation/std arrays, keyed by window.
+    """
+    prices = np.ascontiguousarray(data['Adj Close'].to_numpy(), dtype=np.float32)
+    sma_windows = sorted({int(w) for w in sma_windows})
+    mr_windows = sorted({int(w) for w in mr_windows})
+    n = len(prices)
+    sma = np.empty((len(sma_windows), n))
+    diff = np.empty((len(mr_windows), n))
+    std = np.empty((len(mr_windows), n))
+    _precompute_features(prices, np.array(sma_windows, dtype=np.int64), np.array(mr_windows, dtype=np.int64),
+                         np.array([int(w*0.8) for w in mr_windows], dtype=np.int64), sma, diff, std)
+    return Features(sma={w: sma[k] for k, w in enumerate(sma_windows)},
+                    deviation={w: (diff[k], std[k]) for k, w in enumerate(mr_windows)})
+
 class Strategy:
-    """Base class for trading strategies."""
-    def __init__(self, data):
-        self.data = data.copy()
+    """
+    Base class for trading strategies.
+
+    `data` is referenced, not copied, so it should not be modified while the strategy is in use.
+    The 'Adj Close' column is cached as a contiguous read-only float32 array for the kernels
+    (signals only compare prices, so single precision is enough; the kernels accumulate in float64).
+    `features` is an optional Features from precompute_features(data, ...); strategies use the
+    statistics it holds for their windows instead of recomputing them.
+    """
+    def __init__(self, data, features=None):
+        self.data = data
         if self.data.empty:
             raise ValueError("Input data is empty.")
-        self.signals = pd.DataFrame(index=self.data.index)
-        self.signals['signal'] = 0.0 # Initialize signal column
+        if features is not None:
+            lengths = {len(a) for a in features.sma.values()} | {len(d) for d, _ in features.deviation.values()}
+            if lengths - {len(data)}:
+                raise ValueError(f"Precomputed features do not match the data length ({len(data)}).")
+        self.features = features
+        self._adj_close = np.ascontiguousarray(data['Adj Close'].to_numpy(), dtype=np.float32)
+        self._adj_close.setflags(write=False)
+        # Signals are ternary, so they are kept as int8 and only wrapped in a DataFrame on request
+        self._signal_arr = np.zeros(len(data), dtype=np.int8)
+        self._index = data.index
 
     def generate_signals(self):
         """Generates trading signals (1 for buy, -1 for sell/short, 0 for hold/flat)."""
         raise NotImplementedError("Should implement generate_signals()")
 
     def get_signals(self):
-        """Returns the generated signals DataFrame."""
-        if 'signal' not in self.signals.columns:
-             print("Warning: Signals have not been generated yet.")
-             return pd.DataFrame(index=self.data.index) # Return empty df with index
-        return self.signals
+        """Returns the signals as a DataFrame with a float32 'signal' column (all 0 until generated)."""
+        # The freshly converted column and the existing index are used as-is, without copying
+        return pd.DataFrame({'signal': self._signal_arr.astype(np.float32)}, index=self._index, copy=False)
 
 # --- Momentum Strategy ---
 class MomentumStrategy(Strategy):
@@ -31,23 +99,46 @@ class MomentumStrategy(Strategy):
 
     def generate_signals(self):
         """Generates signals based on simple price momentum."""
-        # Calculate momentum (percentage change over the window)
-        # shift(1) ensures we use past data to decide today's signal
-        momentum = self.data['Adj Close'].pct_change(self.window).shift(1)
-
-        # Buy signal: Positive momentum
-        self.signals.loc[momentum > 0, 'signal'] = 1.0
-        # Sell/Short signal: Negative momentum
-        self.signals.loc[momentum < 0, 'signal'] = -1.0
-        # If momentum is NaN (at the start), signal remains 0
-
-        print(f"Momentum signals generated (Window: {self.window}).")
-        return self.signals
+        # Sign of the price change over the window, using yesterday's price to avoid lookahead bias:
+        # 1 (buy) for positive momentum, -1 (sell/short) for negative; the first window+1 days stay 0
+        _momentum_signals(self._adj_close, self.window, self._signal_arr)
+
+        logger.debug("Momentum signals generated (Window: %s).", self.window)
+        return self.get_signals()
+
+    @classmethod
+    def generate_signals_batch(cls, prices_2d, window=20):
+        """
+        Generates momentum signals for many price series at once, in parallel over columns.
+
+        Args:
+            prices_2d (np.ndarray): (N, K) 'Adj Close' prices, one column per series.
+            window (int): Momentum lookback window.
+
+        Returns:
+            np.ndarray: int8 (N, K) signals, column j matching generate_signals() on series j.
+        """
+        prices = _as_price_matrix(prices_2d)
+        if prices.shape[0] < window + 1:
+             raise ValueError(f"Data length ({prices.shape[0]}) is less than the required momentum window + 1 ({window + 1}).")
+        out = np.zeros(prices.shape, dtype=np.int8, order='F') # one contiguous column per thread, no false sharing
+        _momentum_batch(prices, window, out)
+        return out
 
 # --- Mean Reversion Strategy ---
 class MeanReversionStrategy(Strategy):
-    def __init__(self, data, window=20, entry_z=1.5, exit_z=0.5):
-        super().__init__(data)
+    @staticmethod
+    def OnlineState(window=20, entry_z=1.5, exit_z=0.5):
+        """
+        Returns a state for incremental O(1)-per-bar signals (live/walk-forward use), matching
+        generate_signals(): signal = state.update(price).
+        """
+        if window < 1:
+            raise ValueError(f"Mean reversion window must be positive, got {window}.")
+        return _MeanReversionState(int(window), float(entry_z), float(exit_z))
+
+    def __init__(self, data, window=20, entry_z=1.5, exit_z=0.5, features=None):
+        super().__init__(data, features)
         self.window = window
         self.entry_z = entry_z
         self.exit_z = exit_z
@@ -56,46 +147,58 @@ class MeanReversionStrategy(Strategy):
 
     def generate_signals(self):
         """Generates signals based on mean reversion logic."""
-        # Calculate rolling mean and standard deviation
-        rolling_mean = self.data['Adj Close'].rolling(window=self.window, min_periods=int(self.window*0.8)).mean() # Allow few NaNs at start
-        rolling_std = self.data['Adj Close'].rolling(window=self.window, min_periods=int(self.window*0.8)).std()
-
-        # Avoid division by zero or near-zero std dev
-        rolling_std = rolling_std.replace(0, np.nan)
-
-        # Calculate Z-score
-        z_score = (self.data['Adj Close'] - rolling_mean) / rolling_std
-
-        # Shift signals to avoid lookahead bias
-        z_score_shifted = z_score.shift(1)
-
-        # Entry Signal (Long): Price significantly below mean
-        self.signals.loc[z_score_shifted < -self.entry_z, 'signal'] = 1.0
-
-        # Entry Signal (Short): Price significantly above mean
-        self.signals.loc[z_score_shifted > self.entry_z, 'signal'] = -1.0
-
-        # Exit Signal Logic (Simplified): Exit when Z-score crosses the exit threshold
-        # Note: A stateful backtester handles exits more accurately based on current position.
-        # Here, we generate potential *triggers* for the backtester to use.
-        # If z_score was below -entry_z and now is above -exit_z -> potential long exit
-        # If z_score was above +entry_z and now is below +exit_z -> potential short exit
-        # The backtester interprets signal=0 as "flatten position if held".
-        # Conditions to potentially flatten a long position
-        flatten_long_condition = (self.signals['signal'].shift(1) == 1.0) & (z_score_shifted > -self.exit_z)
-        self.signals.loc[flatten_long_condition, 'signal'] = 0.0
-
-        # Conditions to potentially flatten a short position
-        flatten_short_condition = (self.signals['signal'].shift(1) == -1.0) & (z_score_shifted < self.exit_z)
-        self.signals.loc[flatten_short_condition, 'signal'] = 0.0
-
-        print(f"Mean Reversion signals generated (Window: {self.window}, Entry Z: {self.entry_z}, Exit Z: {self.exit_z}).")
-        return self.signals[['signal']] # Return only the primary signal column
+        # Deviation of each price from its rolling mean, and the rolling std (std of 0 gives NaN)
+        if self.features is not None and self.window in self.features.deviation:
+            diff, std = self.features.deviation[self.window]
+        else:
+            diff = np.empty(len(self._adj_close))
+            std = np.empty(len(self._adj_close))
+            _rolling_deviation(self._adj_close, self.window, int(self.window*0.8), diff, std) # Allow few NaNs at start
+
+        # Entry on a large z-score, exit when it comes back inside +-exit_z (see _mean_reversion_signal)
+        _mean_reversion_signals(diff, std, float(self.entry_z), float(self.exit_z), self._signal_arr)
+
+        logger.debug("Mean Reversion signals generated (Window: %s, Entry Z: %s, Exit Z: %s).",
+                     self.window, self.entry_z, self.exit_z)
+        return self.get_signals()
+
+    @classmethod
+    def generate_signals_batch(cls, prices_2d, window=20, entry_z=1.5, exit_z=0.5):
+        """
+        Generates mean reversion signals for many price series at once, in parallel over columns.
+
+        Args:
+            prices_2d (np.ndarray): (N, K) 'Adj Close' prices, one column per series.
+            window (int): Rolling window for the z-score.
+            entry_z (float): Z-score magnitude that triggers an entry.
+            exit_z (float): Z-score magnitude at which a position is flattened.
+
+        Returns:
+            np.ndarray: int8 (N, K) signals, column j matching generate_signals() on series j.
+        """
+        prices = _as_price_matrix(prices_2d)
+        if prices.shape[0] < window:
+             raise ValueError(f"Data length ({prices.shape[0]}) is less than the required mean reversion window ({window}).")
+        out = np.zeros(prices.shape, dtype=np.int8, order='F') # one contiguous column per thread, no false sharing
+        _mean_reversion_batch(prices, window, int(window*0.8), float(entry_z), float(exit_z), out)
+        return out
 
 # --- SMA Crossover Strategy ---
 class SMACrossoverStrategy(Strategy):
-    def __init__(self, data, short_window=20, long_window=50):
-        super().__init__(data)
+    @staticmethod
+    def OnlineState(short_window=20, long_window=50):
+        """
+        Returns a state for incremental O(1)-per-bar signals (live/walk-forward use), matching
+        generate_signals(): signal = state.update(price).
+        """
+        if short_window < 1:
+            raise ValueError(f"Short window must be positive, got {short_window}.")
+        if short_window >= long_window:
+            raise ValueError("Short window must be less than long window.")
+        return _SMACrossoverState(int(short_window), int(long_window))
+
+    def __init__(self, data, short_window=20, long_window=50, features=None):
+        super().__init__(data, features)
         self.short_window = short_window
         self.long_window = long_window
         if short_window >= long_window:
@@ -105,31 +208,35 @@ class SMACrossoverStrategy(Strategy):
 
     def generate_signals(self):
         """Generates signals based on SMA crossovers."""
-        # Calculate short and long SMAs
-        short_sma = self.data['Adj Close'].rolling(window=self.short_window, min_periods=self.short_window).mean()
-        long_sma = self.data['Adj Close'].rolling(window=self.long_window, min_periods=self.long_window).mean()
-
-        # Generate initial signals based on crossover logic
-        # Shifted comparison to avoid lookahead bias (use yesterday's SMA values for today's signal)
-        self.signals['short_sma'] = short_sma
-        self.signals['long_sma'] = long_sma
-
-        # Signal = 1 if short SMA crossed above long SMA yesterday
-        self.signals.loc[(self.signals['short_sma'].shift(1) > self.signals['long_sma'].shift(1)) &
-                           (self.signals['short_sma'].shift(2) <= self.signals['long_sma'].shift(2)), 'signal'] = 1.0
-
-        # Signal = -1 if short SMA crossed below long SMA yesterday
-        self.signals.loc[(self.signals['short_sma'].shift(1) < self.signals['long_sma'].shift(1)) &
-                           (self.signals['short_sma'].shift(2) >= self.signals['long_sma'].shift(2)), 'signal'] = -1.0
-
-        # Forward fill signals: Hold the position until the next crossover signal
-        self.signals['signal'] = self.signals['signal'].ffill().fillna(0)
-
-        # Correct signals: If yesterday's signal was buy(1), and today short<long, signal becomes 0 (sell)
-        self.signals.loc[(self.signals['signal'].shift(1) == 1.0) & (self.signals['short_sma'] < self.signals['long_sma']), 'signal'] = 0.0
-        # Correct signals: If yesterday's signal was sell(-1), and today short>long, signal becomes 0 (cover short)
-        self.signals.loc[(self.signals['signal'].shift(1) == -1.0) & (self.signals['short_sma'] > self.signals['long_sma']), 'signal'] = 0.0
-
-
-        print(f"SMA Crossover signals generated (Short: {self.short_window}, Long: {self.long_window}).")
-        return self.signals[['signal']]
\ No newline at end of file
+        # Crossovers of yesterday's short/long SMAs (to avoid lookahead bias) give the entry signal;
+        # it is reset to 0 when today's SMAs have already moved back against it
+        sma = self.features.sma if self.features is not None else {}
+        if self.short_window in sma and self.long_window in sma:
+            _crossover_from_smas(sma[self.short_window], sma[self.long_window], self._signal_arr)
+        else:
+            _sma_crossover(self._adj_close, self.short_window, self.long_window, self._signal_arr)
+
+        logger.debug("SMA Crossover signals generated (Short: %s, Long: %s).", self.short_window, self.long_window)
+        return self.get_signals()
+
+    @classmethod
+    def generate_signals_batch(cls, prices_2d, short_window=20, long_window=50):
+        """
+        Generates SMA crossover signals for many price series at once, in parallel over columns.
+
+        Args:
+            prices_2d (np.ndarray): (N, K) 'Adj Close' prices, one column per series.
+            short_window (int): Short SMA window.
+            long_window (int): Long SMA window.
+
+        Returns:
+            np.ndarray: int8 (N, K) signals, column j matching generate_signals() on series j.
+        """
+        prices = _as_price_matrix(prices_2d)
+        if short_window >= long_window:
+            raise ValueError("Short window must be less than long window.")
+        if prices.shape[0] < long_window:
+             raise ValueError(f"Data length ({prices.shape[0]}) is less than the required long SMA window ({long_window}).")
+        out = np.zeros(prices.shape, dtype=np.int8, order='F') # one contiguous column per thread, no false sharing
+        _sma_crossover_batch(prices, short_window, long_window, out)
+        return out
\ No newline at end of file
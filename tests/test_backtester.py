@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backtester import run_backtest, run_backtest_batch
+from src.performance import calculate_performance_metrics, calculate_performance_metrics_batch
+
+
+def _prices(seed=0, n=300):
+    """Random-walk prices with one missing day."""
+    rng = np.random.default_rng(seed)
+    prices = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, n)))
+    prices[150] = np.nan
+    return pd.DataFrame({'Adj Close': prices}, index=pd.bdate_range('2020-01-01', periods=n))
+
+def _market_returns(data):
+    # Same precomputation as main.py (missing/non-finite returns count as 0), kept in float64
+    px = data['Adj Close'].to_numpy(dtype=np.float64)
+    mret = np.zeros_like(px)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mret[1:] = px[1:] / px[:-1] - 1.0
+    mret[~np.isfinite(mret)] = 0.0
+    return mret
+
+def _signal_columns(mret, seed=0):
+    """(name, signal column, allow_shorting) cases covering the metric edge cases."""
+    n = len(mret)
+    rng = np.random.default_rng(seed)
+    nan_signal = rng.choice([-1.0, 0.0, 1.0], n)
+    nan_signal[rng.choice(n, 30, replace=False)] = np.nan
+    # Long (signal the day before) on every up day and on exactly one down day: a single downside return
+    one_down = np.zeros(n)
+    up_days = np.flatnonzero(mret > 0)
+    down_day = np.flatnonzero(mret < 0)[0]
+    one_down[np.r_[up_days, down_day] - 1] = 1.0
+    return [('flat', np.zeros(n), True),
+            ('always_long', np.ones(n), False),
+            ('always_short_long_only', -np.ones(n), False),
+            ('always_short', -np.ones(n), True),
+            ('nan_signal', nan_signal, True),
+            ('single_downside_day', one_down, False)]
+
+
+@pytest.mark.parametrize('risk_free_rate', [0.0, 0.02])
+def test_batch_matches_single_backtests(risk_free_rate):
+    data = _prices()
+    mret = _market_returns(data)
+    cases = _signal_columns(mret)
+    signals = np.column_stack([signal for _, signal, _ in cases])
+    allow_shorting = np.array([shorting for _, _, shorting in cases])
+
+    batch = run_backtest_batch(mret, signals, allow_shorting, index=data.index)
+    batch_metrics = calculate_performance_metrics_batch(batch, risk_free_rate=risk_free_rate)
+
+    for j, (name, signal, shorting) in enumerate(cases):
+        single = run_backtest(data, pd.DataFrame({'signal': signal}, index=data.index),
+                              allow_shorting=shorting, assume_aligned=True)
+        np.testing.assert_allclose(batch.position[:, j], single.position, err_msg=name)
+        np.testing.assert_allclose(batch.equity_curve[:, j], single.equity_curve, rtol=1e-12, err_msg=name)
+
+        expected = calculate_performance_metrics(single, risk_free_rate=risk_free_rate)
+        assert batch_metrics[j].keys() == expected.keys()
+        for key, value in expected.items():
+            np.testing.assert_allclose(batch_metrics[j][key], value, rtol=1e-9, err_msg=f"{name}: {key}")
+
+def test_batch_edge_case_metrics():
+    data = _prices()
+    mret = _market_returns(data)
+    cases = _signal_columns(mret)
+    batch = run_backtest_batch(mret, np.column_stack([signal for _, signal, _ in cases]),
+                               np.array([shorting for _, _, shorting in cases]), index=data.index)
+    metrics = dict(zip([name for name, _, _ in cases], calculate_performance_metrics_batch(batch, risk_free_rate=0.02)))
+
+    # Constant excess returns (-rf/252 every day) have zero std: Sharpe and Sortino are undefined
+    for name in ('flat', 'always_short_long_only'):
+        assert np.isnan(metrics[name]['Annualized Sharpe Ratio'])
+        assert np.isnan(metrics[name]['Annualized Sortino Ratio'])
+        assert metrics[name]['Max Drawdown'] == 0.0
+        assert metrics[name]['Total Trades'] == 0.0
+
+    no_risk_free = calculate_performance_metrics_batch(batch, risk_free_rate=0.0)[-1]
+    # One negative return has no downside deviation, so a positive mean gives an infinite Sortino
+    assert no_risk_free['Annualized Sortino Ratio'] == np.inf
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.strategy import MomentumStrategy, MeanReversionStrategy, SMACrossoverStrategy, precompute_features
+
+
+# --- pandas references (the original generate_signals logic, on the float32 prices the kernels see) ---
+def _momentum_reference(prices, window):
+    momentum = (prices / prices.shift(window) - 1).shift(1)
+    signal = pd.Series(0.0, index=prices.index)
+    signal[momentum > 0] = 1.0
+    signal[momentum < 0] = -1.0
+    return signal.to_numpy()
+
+def _mean_reversion_reference(prices, window, entry_z, exit_z):
+    rolling = prices.rolling(window=window, min_periods=int(window*0.8))
+    rolling_std = rolling.std().replace(0, np.nan)
+    z_score_shifted = ((prices - rolling.mean()) / rolling_std).shift(1)
+    signal = pd.Series(0.0, index=prices.index)
+    signal[z_score_shifted < -entry_z] = 1.0
+    signal[z_score_shifted > entry_z] = -1.0
+    signal[(signal.shift(1) == 1.0) & (z_score_shifted > -exit_z)] = 0.0
+    signal[(signal.shift(1) == -1.0) & (z_score_shifted < exit_z)] = 0.0
+    return signal.to_numpy()
+
+def _sma_crossover_reference(prices, short_window, long_window):
+    short_sma = prices.rolling(window=short_window, min_periods=short_window).mean()
+    long_sma = prices.rolling(window=long_window, min_periods=long_window).mean()
+    signal = pd.Series(0.0, index=prices.index)
+    signal[(short_sma.shift(1) > long_sma.shift(1)) & (short_sma.shift(2) <= long_sma.shift(2))] = 1.0
+    signal[(short_sma.shift(1) < long_sma.shift(1)) & (short_sma.shift(2) >= long_sma.shift(2))] = -1.0
+    signal[(signal.shift(1) == 1.0) & (short_sma < long_sma)] = 0.0
+    signal[(signal.shift(1) == -1.0) & (short_sma > long_sma)] = 0.0
+    return signal.to_numpy()
+
+
+def _random_walk(seed, n=600):
+    """Random-walk prices with scattered NaNs, a NaN gap and constant runs (one longer than every window)."""
+    rng = np.random.default_rng(seed)
+    prices = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, n)))
+    prices[120:200] = prices[120] # constant run longer than every window
+    prices[300:310] = prices[300]
+    prices[rng.choice(n, 15, replace=False)] = np.nan
+    prices[450:455] = np.nan
+    return prices.astype(np.float32)
+
+def _frame(prices):
+    return pd.DataFrame({'Adj Close': prices}, index=pd.bdate_range('2020-01-01', periods=len(prices)))
+
+def _reference_prices(data):
+    # The strategies round prices to float32; the references see the same values in float64
+    return data['Adj Close'].astype(np.float32).astype(np.float64)
+
+SEEDS = [0, 1, 2]
+MR_PARAMS = [(20, 1.0, 0.0), (20, 1.5, 0.5), (40, 2.0, 0.5)]
+SMA_PARAMS = [(5, 20), (15, 40), (20, 60)]
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('window', [2, 20, 60])
+def test_momentum_matches_pandas(seed, window):
+    data = _frame(_random_walk(seed))
+    signals = MomentumStrategy(data, window=window).generate_signals()['signal'].to_numpy()
+    np.testing.assert_array_equal(signals, _momentum_reference(_reference_prices(data), window))
+
+def test_momentum_nan_price_gives_no_signal():
+    data = _frame(np.array([100, 101, np.nan, 103, 104, 105, 99, 98], dtype=np.float32))
+    signals = MomentumStrategy(data, window=2).generate_signals()['signal'].to_numpy()
+    np.testing.assert_array_equal(signals, [0, 0, 0, 0, 1, 0, 1, -1])
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('window, entry_z, exit_z', MR_PARAMS)
+def test_mean_reversion_matches_pandas(seed, window, entry_z, exit_z):
+    data = _frame(_random_walk(seed))
+    signals = MeanReversionStrategy(data, window, entry_z, exit_z).generate_signals()['signal'].to_numpy()
+    np.testing.assert_array_equal(signals, _mean_reversion_reference(_reference_prices(data), window, entry_z, exit_z))
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('short_window, long_window', SMA_PARAMS)
+def test_sma_crossover_matches_pandas(seed, short_window, long_window):
+    data = _frame(_random_walk(seed))
+    signals = SMACrossoverStrategy(data, short_window, long_window).generate_signals()['signal'].to_numpy()
+    np.testing.assert_array_equal(signals, _sma_crossover_reference(_reference_prices(data), short_window, long_window))
+
+
+# --- The batch, online and precomputed-features paths must match generate_signals exactly ---
+def _price_matrix():
+    return np.column_stack([_random_walk(seed) for seed in SEEDS])
+
+def test_momentum_batch_matches_single():
+    prices = _price_matrix()
+    batch = MomentumStrategy.generate_signals_batch(prices, window=20)
+    for j in range(prices.shape[1]):
+        single = MomentumStrategy(_frame(prices[:, j]), window=20).generate_signals()['signal'].to_numpy()
+        np.testing.assert_array_equal(batch[:, j], single)
+
+@pytest.mark.parametrize('window, entry_z, exit_z', MR_PARAMS)
+def test_mean_reversion_batch_online_and_features_match_single(window, entry_z, exit_z):
+    prices = _price_matrix()
+    batch = MeanReversionStrategy.generate_signals_batch(prices, window, entry_z, exit_z)
+    for j in range(prices.shape[1]):
+        data = _frame(prices[:, j])
+        single = MeanReversionStrategy(data, window, entry_z, exit_z).generate_signals()['signal'].to_numpy()
+        np.testing.assert_array_equal(batch[:, j], single)
+
+        state = MeanReversionStrategy.OnlineState(window, entry_z, exit_z)
+        np.testing.assert_array_equal([state.update(p) for p in prices[:, j]], single)
+
+        features = precompute_features(data, mr_windows=[window])
+        shared = MeanReversionStrategy(data, window, entry_z, exit_z, features=features).generate_signals()
+        np.testing.assert_array_equal(shared['signal'].to_numpy(), single)
+
+@pytest.mark.parametrize('short_window, long_window', SMA_PARAMS)
+def test_sma_crossover_batch_online_and_features_match_single(short_window, long_window):
+    prices = _price_matrix()
+    batch = SMACrossoverStrategy.generate_signals_batch(prices, short_window, long_window)
+    for j in range(prices.shape[1]):
+        data = _frame(prices[:, j])
+        single = SMACrossoverStrategy(data, short_window, long_window).generate_signals()['signal'].to_numpy()
+        np.testing.assert_array_equal(batch[:, j], single)
+
+        state = SMACrossoverStrategy.OnlineState(short_window, long_window)
+        np.testing.assert_array_equal([state.update(p) for p in prices[:, j]], single)
+
+        features = precompute_features(data, sma_windows=[short_window, long_window])
+        shared = SMACrossoverStrategy(data, short_window, long_window, features=features).generate_signals()
+        np.testing.assert_array_equal(shared['signal'].to_numpy(), single)
+
+def test_online_state_rejects_invalid_windows():
+    with pytest.raises(ValueError):
+        MeanReversionStrategy.OnlineState(0, 1.5, 0.5)
+    with pytest.raises(ValueError):
+        SMACrossoverStrategy.OnlineState(50, 20)